@@ -0,0 +1,37 @@
+# Configurazione gunicorn per solveBAF
+# Uso: gunicorn -c gunicorn.conf.py solveBAF:app
+
+import gc
+
+# GC disattivato nel master fino al fork: una raccolta tra l'import e il fork
+# rimescolerebbe le pagine che i worker devono condividere (riattivato in post_fork)
+gc.disable()
+
+bind = "127.0.0.1:5000"
+workers = 4
+
+# Importa l'app nel master prima del fork: Flask, clingo e lo stato in sola
+# lettura (semantiche, cache) sono condivisi dai worker in copy-on-write.
+# Il warm-up avviene all'import di solveBAF (vedi warm_up()).
+preload_app = True
+
+
+def when_ready(server):
+    # Solo con preload: il modulo e' gia' importato (e warm) nel master.
+    # Senza preload non va importato qui, altrimenti i worker erediterebbero
+    # un modulo del master non ricaricato dopo un HUP.
+    if not server.cfg.preload_app:
+        return
+    import solveBAF
+    # Sposta gli oggetti gia' creati fuori dal GC, cosi' le sue scansioni
+    # nei worker non sporcano le pagine condivise
+    gc.freeze()
+    if solveBAF.WARM_STATE["warm"]:
+        server.log.info("solveBAF warm: semantiche %s", solveBAF.WARM_STATE["semantics"])
+    else:
+        server.log.error("solveBAF warm-up fallito: %s", solveBAF.WARM_STATE["error"])
+
+
+def post_fork(server, worker):
+    # Nel worker: riattiva il GC disattivato all'avvio del master
+    gc.enable()
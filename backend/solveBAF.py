@@ -4,17 +4,56 @@ import clingo
 import os
 import tempfile
 import math
-import numpy as np   # per ddr
+import re
+from functools import lru_cache
+
+# numpy NON viene importato qui: serve solo a ddr ed e' caricato lazy (vedi _numpy)
 
 app = Flask(__name__)
 
 UPLOAD_FOLDER = '/var/www/compute/apxtemp/'  # Directory file temporanei
+# Directory file semantiche (.dl), relativa al modulo e non alla cwd
+SEM_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sem')
+
+############################
+#   STATO CONDIVISO (RO)   #
+############################
+
+# Stato in sola lettura costruito una volta per processo (o nel master gunicorn
+# con --preload, cosi' i worker lo condividono in copy-on-write dopo il fork).
+# NB: i file .dl vengono letti una sola volta: modifiche o nuove semantiche
+# richiedono il riavvio di gunicorn.
+SEM_CACHE = {}      # nome semantica -> contenuto del file .dl
+WARM_STATE = {
+    "warm": False,
+    "error": None,     # motivo del fallimento del warm-up, se fallito
+    "pid": None,       # pid del processo che ha eseguito il warm-up
+    "semantics": [],
+    "clingo": clingo.__version__,
+}
+
+def carica_semantica(sem):
+    """
+    Restituisce il contenuto del file di semantica, leggendolo da disco solo
+    la prima volta. Solleva RuntimeError se il file non esiste.
+    """
+    if sem not in SEM_CACHE:
+        sem_path = os.path.join(SEM_FOLDER, f"{sem}.dl")
+        if not os.path.isfile(sem_path):
+            raise RuntimeError(f"File semantica {sem_path} non trovato")
+        with open(sem_path, 'r', encoding='utf-8') as f:
+            SEM_CACHE[sem] = f.read()
+    return SEM_CACHE[sem]
 
 ############################
 # PARTE ASP CLASSICA BAF   #
 ############################
 
 def concatena_file(graph, sem, output_file):
+    """
+    graph: path del file APX
+    sem: nome della semantica (es. 'grounded'), caricata da SEM_CACHE
+    """
     try:
         with open(output_file, 'w', encoding='utf-8') as out_f:
             # Scrive il contenuto del grafo
@@ -31,8 +70,7 @@ def concatena_file(graph, sem, output_file):
             out_f.write('atta(X,Y) :- att(X,Z), argu(X), argu(Z), support(Z,Y), argu(Y).\n')
 
             # Scrive il contenuto della semantica
-            with open(sem, 'r', encoding='utf-8') as f2:
-                out_f.write(f2.read())
+            out_f.write(carica_semantica(sem))
 
             # Aggiunge le righe finali
             out_f.write('\n')
@@ -53,14 +91,13 @@ def compute(baf_file, sem):
     ctl = clingo.Control(logger=quiet_logger)
     ctl.configuration.solve.models = 0
 
-    sem_path = os.path.join("sem", f"{sem}.dl")
-    if not os.path.isfile(sem_path):
-        raise RuntimeError(f"File semantica {sem_path} non trovato")
+    # verifica la semantica prima di scrivere il file temporaneo
+    carica_semantica(sem)
 
     # FILE TEMPORANEO temp.dl nella CHIARA CARTELLA TEMP
     temp_dl_path = os.path.join(UPLOAD_FOLDER, "temp.dl")
 
-    concatena_file(baf_file, sem_path, temp_dl_path)
+    concatena_file(baf_file, sem, temp_dl_path)
 
     ctl.load(temp_dl_path)
     ctl.ground([("base", [])])
@@ -223,10 +260,24 @@ def drl(a, t, attackers, supporters, score, weights_rel, params, gamma=1.0):
     delta = aggregation(a, t, attackers, supporters, score, weights_rel, params)
     return (max(-1, min(1, (2 * tau_a - 1 + delta * gamma))) + 1) / 2
 
+_np = None
+
+def _numpy():
+    """
+    Import lazy di numpy: viene caricato solo al primo uso di ddr e poi
+    riusato, senza rieseguire l'import a ogni chiamata.
+    """
+    global _np
+    if _np is None:
+        import numpy
+        _np = numpy
+    return _np
+
 def ddr(a, t, attackers, supporters, score, weights_rel, params, gamma=1.0):
     tau_a = score[a][0]
     delta = aggregation(a, t, attackers, supporters, score, weights_rel, params)
     z = (2 * tau_a - 1 + delta * gamma)
+    np = _numpy()
 
     numerator = 1 + np.exp(100 * (z + 1))
     denominator = 1 + np.exp(100 * (z - 1))
@@ -282,8 +333,6 @@ def compute_qbaf_with_results(content, sem, params=None, gamma=None, verbose=Fal
 #    FILTRI CONSTRAINT     #
 ############################
 
-import re
-
 # Definizioni:
 # - Un "Labelling" è una lista di stringhe che rappresentano gli stati degli elementi,
 #   es. ['in(a)', 'ou(b)'].
@@ -371,6 +420,8 @@ def _find_split_point(formula_str, operator_char):
     # Il parsing viene fatto ricorsivamente, quindi cerchiamo il più "esterno" in balance=0.
     return split_index
 
+ATOMIC_RE = re.compile(r'^[a-z]+\([a-z]\)$')
+
 def _parse_formula_recursive(formula_str):
     """
     Converte una stringa di formula in un AST (Abstract Syntax Tree).
@@ -425,11 +476,19 @@ def _parse_formula_recursive(formula_str):
         return AndOperator(left_node, right_node)
 
     # 5. Proposizione Atomica (es. in(a))
-    if re.fullmatch(r'^[a-z]+\([a-z]\)$', formula_str):
+    if ATOMIC_RE.fullmatch(formula_str):
         return AtomicProposition(formula_str)
     
     raise ValueError(f"Constraint non valido o formato non gestito: '{formula_str}'")
 
+@lru_cache(maxsize=1024)
+def parse_constraint(constraint_str):
+    """
+    Versione con cache di _parse_formula_recursive: gli AST sono usati in sola
+    lettura, quindi lo stesso constraint viene parsificato una volta per processo.
+    """
+    return _parse_formula_recursive(constraint_str)
+
 def filtra_labelling(lab, const):
     """
     Filtra la lista di labelling (lab) per includere solo quelli che soddisfano
@@ -446,7 +505,7 @@ def filtra_labelling(lab, const):
     parsed_constraints = []
     try:
         for constraint_str in const:
-            parsed_constraints.append(_parse_formula_recursive(constraint_str))
+            parsed_constraints.append(parse_constraint(constraint_str))
     except ValueError as e:
         print(f"ERRORE nel parsing dei constraints: {e}")
         return []
@@ -615,13 +674,75 @@ def filter_labelings_api():
 
 
 ############################
-#         TEST             #
+#   WARM-UP E READINESS    #
 ############################
 
+def warm_up():
+    """
+    Prepara lo stato condiviso in sola lettura: carica tutte le semantiche in
+    SEM_CACHE ed esegue un solve banale come smoke test del solver.
+    Idempotente: chiamate successive non fanno nulla.
+    Viene chiamata all'import del modulo: con gunicorn --preload gira nel
+    master prima del fork, altrimenti in ogni worker.
+    Solleva RuntimeError se non trova nessun file di semantica.
+    """
+    if WARM_STATE["warm"]:
+        return WARM_STATE
+
+    semantics = []
+    if os.path.isdir(SEM_FOLDER):
+        for name in sorted(os.listdir(SEM_FOLDER)):
+            if name.endswith('.dl'):
+                sem = name[:-len('.dl')]
+                carica_semantica(sem)
+                semantics.append(sem)
+
+    if not semantics:
+        raise RuntimeError(f"Nessun file di semantica trovato in {SEM_FOLDER}")
 
-@app.route("/testcheck")
-def testcheck():
-    return "OK FROM THIS FILE"
+    # smoke test: verifica che clingo funzioni (il Control non viene riusato)
+    ctl = clingo.Control(logger=quiet_logger)
+    ctl.configuration.solve.models = 0
+    ctl.add("base", [], "arg(a).")
+    ctl.ground([("base", [])])
+    ctl.solve()
+
+    WARM_STATE["semantics"] = semantics
+    WARM_STATE["pid"] = os.getpid()
+    WARM_STATE["error"] = None
+    WARM_STATE["warm"] = True
+    return WARM_STATE
+
+
+@app.route("/ready")
+def ready():
+    """
+    Readiness check: 200 se il processo ha lo stato condiviso pronto, 503 altrimenti
+    (con il motivo in 'error' se il warm-up all'import e' fallito).
+    'preloaded' e' True se il warm-up e' stato fatto nel master prima del fork.
+    """
+    if WARM_STATE["warm"]:
+        stato = "ready"
+    elif WARM_STATE["error"]:
+        stato = "error"
+    else:
+        stato = "warming"
+
+    status = {
+        "status": stato,
+        "warm": WARM_STATE["warm"],
+        "error": WARM_STATE["error"],
+        "semantics": WARM_STATE["semantics"],
+        "clingo": WARM_STATE["clingo"],
+        "preloaded": WARM_STATE["warm"] and WARM_STATE["pid"] != os.getpid(),
+        "pid": os.getpid(),
+    }
+    return jsonify(status), (200 if WARM_STATE["warm"] else 503)
+
+
+############################
+#         TEST             #
+############################
 
 
 
@@ -661,12 +782,64 @@ def test_constraints():
         print(f"  {r}")
     
 
+def test_warm_up():
+    # --- Verifica warm-up, readiness e cache ---
+    client = app.test_client()
+
+    # /ready risponde 503 finche' il processo non e' warm
+    WARM_STATE["warm"] = False
+    assert client.get("/ready").status_code == 503
+
+    # un warm-up fallito viene riportato da /ready con il motivo
+    WARM_STATE["error"] = "errore di prova"
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.get_json()["status"] == "error"
+
+    # warm_up carica le semantiche e porta /ready a 200
+    state = warm_up()
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.get_json()["error"] is None
+    assert response.get_json()["semantics"] == state["semantics"]
+    assert set(state["semantics"]) <= set(SEM_CACHE)
+
+    # idempotente: una seconda chiamata non rifa' il warm-up
+    assert warm_up() is state and state["pid"] == os.getpid()
+
+    # una semantica inesistente solleva RuntimeError
+    try:
+        carica_semantica("inesistente")
+        assert False, "carica_semantica non ha sollevato errore"
+    except RuntimeError:
+        pass
+
+    # lo stesso constraint viene parsificato una sola volta
+    hits = parse_constraint.cache_info().hits
+    filtra_labelling([['in(a)']], ['in(a); in(b)'])
+    filtra_labelling([['in(b)']], ['in(a); in(b)'])
+    assert parse_constraint.cache_info().hits > hits
+
+    print("test_warm_up OK")
+
+
 
 ############################
 #          MAIN            #
 ############################
+
+# Warm-up all'import: con --preload nel master, altrimenti in ogni worker
+# (anche con flask run o altri host WSGI). Se fallisce l'app si carica
+# comunque: /ready risponde 503 con il motivo, le API che non usano sem/
+# (computeQBAF, filterLabelings) continuano a funzionare.
+try:
+    warm_up()
+except Exception as e:
+    WARM_STATE["error"] = str(e)
+    print(f"ERRORE nel warm-up: {e}", flush=True)
 	
 	
 if __name__ == "__main__":
     #test_constraints()
+    #test_warm_up()
     app.run(host='0.0.0.0', port=5000)